@@ -2,8 +2,12 @@
 # -*- coding: utf-8 -*-
 
 import collections
+import concurrent.futures
 import csv
 import datetime
+import hashlib
+import os
+import shutil
 import types
 import yaml
 
@@ -211,9 +215,11 @@ Verpflegungspunkte/Zeitmessung
             return
         else:
             _tagname = ""
-        
-        ranking_list = self.rankings[tag]
-        
+
+        print(self._get_ranking(self.rankings[tag], _tagname))
+
+    def _get_ranking(self, ranking_list, tagname):
+
         stats = (len(ranking_list["FIN"]),
                  len(ranking_list["DNF"]),
                  len(ranking_list["DSQ"]),
@@ -233,7 +239,7 @@ DSQ:      {:<4} ({} %)
 Total:    {}
 =========================
 
-""".format(_tagname,
+""".format(tagname,
            stats[0], round(stats[0] / stats[4] * 100, 1),
            stats[1], round(stats[1] / stats[4] * 100, 1),
            stats[2], round(stats[2] / stats[4] * 100, 1),
@@ -261,8 +267,8 @@ Total:    {}
 
             if len(ranking_list[_]) > 0:  # avoid unnecessary rules
                 returnstring += RULE
-        
-        print(returnstring)
+
+        return returnstring
 
     def _sort_pace(self, pace):
         
@@ -270,7 +276,8 @@ Total:    {}
             hour, minute = pace[0].split(":")
             return int(hour), int(minute)
         except ValueError:
-            return
+            # missing pace, p.e. 2022, sorts last
+            return float("inf"), 0
 
     def _runner_details_rr(self, data, vp_index):
         
@@ -523,6 +530,11 @@ Total:    {}
                             - default is 10
                             - use 0 to show all
         """
+
+        print(self._get_vp_stats(vp, tag, list_runners))
+
+    def _get_vp_stats(self, vp, tag, list_runners):
+
         pass_all = []
         pace = []
         for startnr, r in self.results.items():
@@ -608,52 +620,210 @@ Split pace in min/km
            pace[3][0], pace[3][1], pace[3][2],
            pace[4][0], pace[4][1], pace[4][2],
            )
-           
-        print(returnstring)
+
+        return returnstring
 
     def runner_stats(self, nr):
         
         """print result table for given startnr"""
         
+        print(self._get_runner_stats(nr))
+
+    def _get_runner_stats(self, nr):
+
         r = self.results[nr]
-        print("""
+        returnstring = """
 Name: {} ({}) - Platz: {}
 StartNr: {} - Kategorie: {}
 Zeit: {} - Pace: {} - Rückstand: {}
-~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~""".format(r.name,
-                                                                r.nation,
-                                                                r.rank,
-                                                                nr,
-                                                                r.cat,
-                                                                r.finishtime,
-                                                                r.pace,
-                                                                r.lag,
-                                                                )
-              )
-        row = "{:<8} {:>10} {:>12} {:>14}   {}"
-        print(row.format("VP",
-                         "Split time",
-                         "Split pace",
-                         "Time (total)",
-                         "",  # placeholder for note
-                         ))
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+""".format(r.name,
+           r.nation,
+           r.rank,
+           nr,
+           r.cat,
+           r.finishtime,
+           r.pace,
+           r.lag,
+           )
+        row = "{:<8} {:>10} {:>12} {:>14}   {}\n"
+        returnstring += row.format("VP",
+                                   "Split time",
+                                   "Split pace",
+                                   "Time (total)",
+                                   "",  # placeholder for note
+                                   )
         for stage in r.stages:
             t = r.stages[stage].time_total.total_seconds()
             time_total = "{}:{:>02}:{:>02}".format(int(t // 3600),
                                                    int(t % 3600 // 60),
                                                    int(t % 60,),
                                                    )
-            print(row.format(stage,
-                             r.stages[stage].time,
-                             r.stages[stage].pace,
-                             time_total,
-                             r.stages[stage].note,
-                             )
-                  )
-        print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+            returnstring += row.format(stage,
+                                       r.stages[stage].time,
+                                       r.stages[stage].pace,
+                                       time_total,
+                                       r.stages[stage].note,
+                                       )
+        returnstring += "~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~"
+        return returnstring
 
     def course_info(self):
         
         """print course info table for current year"""
         
         print(self._get_course(self.vp_list))
+
+
+def _page(title, text):
+    
+    """wrap plain text output into markdown page"""
+    
+    return "# {}\n\n```\n{}\n```\n".format(title, text.strip("\n"))
+
+
+def _write(filename, content):
+    
+    with open(filename, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def _fingerprint(year, vp_data):
+    
+    """
+    hash of csv file, vp_list.yaml entry and this script the year's pages
+    depend on
+    """
+    
+    h = hashlib.sha256()
+    with open(__file__, "rb") as f:
+        h.update(f.read())
+    with open("results/result_course_{}.csv".format(year), "rb") as f:
+        h.update(f.read())
+    h.update(yaml.safe_dump(vp_data[YEAR_COURSE[year]],
+                            sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def _build_year(year, outdir):
+    
+    """
+    write all pages of given year to outdir/year, returns number of pages
+    and list of skipped pages
+    """
+    
+    res = Results(year)
+    yeardir = os.path.join(outdir, str(year))
+    # start from scratch so no pages of removed runners remain
+    shutil.rmtree(yeardir, ignore_errors=True)
+    os.makedirs(yeardir)
+    
+    # 2011 results only
+    if year == 2011:
+        tags = ["all"]
+    else:
+        tags = [t for t in TAGS.keys() if res.rankings[t]["total"] > 0]
+    
+    pages = []
+    skipped = []
+    
+    _write(os.path.join(yeardir, "course.md"),
+           _page("{} - Strecke".format(year), res._get_course(res.vp_list)))
+    pages.append(("Strecke", "course.md"))
+    
+    for tag in tags:
+        filename = "ranking_{}.md".format(tag)
+        title = "Ranking {}".format(TAGS.get(tag, "")).strip()
+        _write(os.path.join(yeardir, filename),
+               _page("{} - {}".format(year, title),
+                     res._get_ranking(res.rankings[tag], TAGS.get(tag, ""))))
+        pages.append((title, filename))
+    
+    # vp_stats "all" includes single runners and relays
+    vp_tags = ["all"] + [t for t in tags if t != "all"]
+    for vp in res.vp_index:
+        for tag in vp_tags:
+            # some vp names contain slashes, p.e. "VP7/WP1"
+            filename = "vp_{}_{}.md".format(vp.replace("/", "-"), tag)
+            title = "{} ({})".format(vp, TAGS.get(tag, "alle"))
+            try:
+                text = res._get_vp_stats(vp, tag, 0)
+            except (IndexError, ZeroDivisionError):
+                # too few or invalid measurements
+                skipped.append(filename)
+                continue
+            _write(os.path.join(yeardir, filename),
+                   _page("{} - {}".format(year, title), text))
+            pages.append((title, filename))
+    
+    for nr in sorted(res.results.keys()):
+        filename = "runner_{}.md".format(nr)
+        title = "{} ({})".format(res.results[nr].name, nr)
+        _write(os.path.join(yeardir, filename),
+               _page("{} - {}".format(year, title),
+                     res._get_runner_stats(nr)))
+        pages.append((title, filename))
+    
+    index = "# {}\n\n".format(year)
+    for title, filename in pages:
+        index += "* [{}]({})\n".format(title, filename)
+    _write(os.path.join(yeardir, "index.md"), index)
+    
+    return len(pages) + 1, skipped
+
+
+def build_reports(outdir="site", years=None, force=False, processes=None):
+    
+    """
+    write course info, rankings, vp stats and runner stats of all years as
+    markdown pages to outdir, one process per year
+    
+    Arguments:
+        outdir: output directory - default is "site"
+        years: list of years - default is all years
+        force: rebuild all pages even if csv file and vp list didn't change
+        processes: number of worker processes - default is number of CPUs
+    
+    Only years whose csv file, vp_list.yaml entry or this script changed
+    since the last build are regenerated, returns list of regenerated years.
+    """
+    
+    if years is None:
+        years = list(YEAR_COURSE.keys())
+    
+    with open(VP_FILE) as f:
+        vp_data = yaml.safe_load(f)
+    
+    todo = dict()
+    for year in years:
+        fingerprint = _fingerprint(year, vp_data)
+        try:
+            with open(os.path.join(outdir, str(year), ".fingerprint")) as f:
+                unchanged = f.read() == fingerprint
+        except FileNotFoundError:
+            unchanged = False
+        if force or not unchanged:
+            todo[year] = fingerprint
+    
+    os.makedirs(outdir, exist_ok=True)
+    with concurrent.futures.ProcessPoolExecutor(processes) as executor:
+        futures = {executor.submit(_build_year, year, outdir): year
+                   for year in todo}
+        for future in concurrent.futures.as_completed(futures):
+            year = futures[future]
+            count, skipped = future.result()
+            # written last so an aborted build is redone next time
+            _write(os.path.join(outdir, str(year), ".fingerprint"),
+                   todo[year])
+            print("{}: {} Seiten erstellt, {} übersprungen".format(
+                year, count, len(skipped)))
+            for filename in skipped:
+                print("    übersprungen: {}".format(filename))
+    
+    index = "# 100 Meilen Berlin\n\n"
+    for year in sorted(YEAR_COURSE.keys()):
+        if os.path.exists(os.path.join(outdir, str(year), "index.md")):
+            index += "* [{}]({}/index.md)\n".format(year, year)
+    _write(os.path.join(outdir, "index.md"), index)
+    
+    return sorted(todo.keys())